@@ -2,6 +2,7 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django, WebSocket connections to the task event stream.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +14,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup, as it relies on the app registry being ready
+from tasks.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Route each connection to the matching ASGI application."""
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -24,9 +24,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-x0z5k#7ib*3icmc2))nuw$sha2)+3#q#swo%4zz@5)t1k!7!lm'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Off unless DJANGO_DEBUG=1, e.g. for local development.
+DEBUG = environ.get('DJANGO_DEBUG') == '1'
 
-ALLOWED_HOSTS = []
+# Comma separated, e.g. DJANGO_ALLOWED_HOSTS=tasks.example.com
+ALLOWED_HOSTS = list(filter(None, environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')))
 
 
 # Application definition
@@ -47,12 +49,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'helpers.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'helpers.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -89,6 +93,49 @@ DATABASES = {
     }
 }
 
+# Optional read replicas, e.g. DB_REPLICA_HOSTS=replica-1,replica-2
+# Each one becomes a 'replicaN' alias sharing the primary's credentials.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['helpers.db_routers.ReplicaRouter']
+
+# GET requests to these URL namespaces may read from a replica
+REPLICA_READ_NAMESPACES = ['user', 'tasks']
+
+# Seconds a client keeps reading from the primary after it writes.
+# Pins live in the default cache, so replicas require CACHE_REDIS_URL.
+REPLICA_PIN_SECONDS = int(environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Shared between processes when CACHE_REDIS_URL (e.g. redis://cache:6379/0)
+# is set, otherwise local to each process.
+
+if environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -125,6 +172,29 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# Content-hashed names plus gzip and brotli copies, made by collectstatic.
+# Pages then link to the hashed names, which only exist once collected,
+# so this is only used where files are collected, e.g. the Docker image.
+if environ.get('DJANGO_STATIC_MANIFEST') == '1':
+    STATICFILES_STORAGE = 'helpers.storage.StaticFilesStorage'
+
+# The React production build ('npm run build'), served if it exists.
+# Its static/ folder is collected alongside the other static files, and
+# StaticFilesMiddleware serves the rest (index.html, manifest.json etc.)
+# from the site root. The Docker image builds it into /frontend/build,
+# and drops the static/ folder once collected.
+FRONTEND_BUILD_DIR = Path(
+    environ.get('FRONTEND_BUILD_DIR', BASE_DIR.parent.parent / 'frontend' / 'build')
+)
+STATICFILES_DIRS = []
+WHITENOISE_ROOT = None
+if FRONTEND_BUILD_DIR.is_dir():
+    WHITENOISE_ROOT = FRONTEND_BUILD_DIR
+if (FRONTEND_BUILD_DIR / 'static').is_dir():
+    STATICFILES_DIRS.append(FRONTEND_BUILD_DIR / 'static')
+WHITENOISE_INDEX_FILE = True
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -132,3 +202,8 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'helpers.User'
+
+TEST_RUNNER = 'helpers.testing.QueryBaselineRunner'
+
+# Maximum SQL queries per endpoint, checked by helpers.testing
+QUERY_BASELINE_FILE = BASE_DIR / 'query_baseline.json'
@@ -0,0 +1,41 @@
+"""
+Django settings for API-only worker processes.
+
+Drops the apps only needed by the admin site and browsable API (admin,
+messages, staticfiles) and static file serving, so workers import less.
+The gain is small: about 13 fewer modules and a few ms out of ~450 ms,
+as 'manage.py profile_startup' shows. Most of startup is Django itself
+and DRF's generic views, imported by user.views (~120 ms), which any
+API worker needs.
+Select with DJANGO_SETTINGS_MODULE=app.settings_api.
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+UNUSED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+UNUSED_MIDDLEWARE = [
+    'helpers.middleware.StaticFilesMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in UNUSED_MIDDLEWARE
+]
+
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if processor != 'django.contrib.messages.context_processors.messages'
+]
+
+REST_FRAMEWORK = {
+    # The browsable API needs templates and static files; serve JSON only
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
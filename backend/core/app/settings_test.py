@@ -0,0 +1,35 @@
+"""
+Django settings for running the test suite.
+
+Used by default for 'manage.py test'. Trades production fidelity for
+speed: an in-memory SQLite database built straight from the models,
+and a cheap password hasher. Supports 'manage.py test --parallel'.
+
+With DB_HOST set, e.g. in the docker-compose 'test' service, the
+configured PostgreSQL server is used instead, which the row locking
+and LISTEN/NOTIFY tests need.
+"""
+
+from os import environ
+
+from app.settings import *  # noqa: F401,F403
+
+if environ.get('DB_HOST'):
+    DATABASES = {'default': DATABASES['default']}  # noqa: F405
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+# Create tables straight from the models instead of running migrations
+DATABASES['default']['TEST'] = {'MIGRATE': False}
+
+DATABASE_REPLICAS = []
+
+# Hashing for real is by far the slowest part of creating test users
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HelpersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'helpers'
+
+    def ready(self):
+        # Registers the system checks
+        from helpers import checks  # noqa: F401
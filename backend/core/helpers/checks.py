@@ -0,0 +1,29 @@
+"""
+System checks for project configuration.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+
+
+@register(Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Read replicas need a cache shared by every process for pinning."""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            'Read replicas are configured but the default cache is not '
+            'shared between processes, so clients would not read their '
+            'own writes.',
+            hint='Set CACHE_REDIS_URL, or another shared cache backend.',
+            id='helpers.E001',
+        )
+    ]
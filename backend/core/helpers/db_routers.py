@@ -0,0 +1,60 @@
+"""
+Database routers.
+"""
+
+import random
+from contextvars import ContextVar
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Set by ReplicaRoutingMiddleware for requests that may read from a replica
+use_replica = ContextVar('use_replica', default=False)
+
+
+def get_credentials(request) -> str:
+    """
+    Return what identifies the client behind request: its Authorization
+    header or session cookie, or '' if it sent neither. Worked out from
+    the request alone rather than request.user, so no query is needed.
+    Not its address, which is shared by every client behind a proxy.
+    """
+    return (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+    )
+
+
+def pin_key(credentials: str) -> str:
+    return 'replica-pin:' + sha256(credentials.encode()).hexdigest()
+
+
+def pin_to_primary(credentials: str):
+    """
+    Make reads sent with credentials use the primary for the next
+    REPLICA_PIN_SECONDS, so they see what was just written.
+    """
+    if settings.DATABASE_REPLICAS and credentials:
+        cache.set(pin_key(credentials), True, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaRouter:
+    """Send reads to a replica when the current request allows it."""
+    def db_for_read(self, model, **hints):
+        """Pick a random replica, or leave the choice to Django."""
+        if settings.DATABASE_REPLICAS and use_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        """All writes go to the primary, even for objects read elsewhere."""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas hold the same data, so relations are always fine."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary; replicas follow it."""
+        return db == 'default'
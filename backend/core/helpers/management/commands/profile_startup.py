@@ -0,0 +1,78 @@
+"""
+Django command reporting the slowest imports during Django setup
+"""
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Setup plus loading the URLconf, which imports every view
+SETUP_SCRIPT = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Parse the stderr of 'python -X importtime' into
+    (self_us, cumulative_us, module) tuples.
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header row
+        timings.append(
+            (int(fields[0]), int(fields[1]), fields[2].strip())
+        )
+    return timings
+
+
+class Command(BaseCommand):
+    """Django command to profile import time of Django setup."""
+    help = 'Report the slowest modules imported while setting up Django.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of modules to list (default 20).',
+        )
+        parser.add_argument(
+            '--sort', choices=['self', 'cumulative'], default='cumulative',
+            help='Rank modules by their own or cumulative import time.',
+        )
+
+    def handle(self, *args, **options):
+        """EntryPoint for Command."""
+        # A fresh interpreter, as this one has already imported everything
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SETUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Django setup failed:\n{result.stderr}')
+
+        timings = parse_importtime(result.stderr)
+        column = 0 if options['sort'] == 'self' else 1
+        timings.sort(key=lambda timing: timing[column], reverse=True)
+
+        total = sum(timing[0] for timing in timings)
+        self.stdout.write(
+            f'{len(timings)} modules imported in {total / 1000:.1f} ms '
+            f'using {settings.SETTINGS_MODULE}'
+        )
+        self.stdout.write(f'{"self ms":>10} {"cumul. ms":>10}  module')
+        for self_us, cumulative_us, module in timings[:options['limit']]:
+            self.stdout.write(
+                f'{self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}  {module}'
+            )
@@ -0,0 +1,85 @@
+"""
+Custom middleware.
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from helpers.db_routers import (
+    get_credentials,
+    pin_key,
+    pin_to_primary,
+    use_replica,
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Bundles named by the React build, e.g. js/787.28cb0dcd.chunk.js
+REACT_BUNDLE = re.compile(r'(js|css)/[^/]+\.[0-9a-f]{8}(\.chunk)?\.(js|css)')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let GET requests to REPLICA_READ_NAMESPACES read from a replica,
+    unless the same client wrote within the last REPLICA_PIN_SECONDS,
+    in which case it keeps reading from the primary to see its write.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(get_credentials(request))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Decide which database this request reads from."""
+        if not (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and request.resolver_match.namespace
+            in settings.REPLICA_READ_NAMESPACES
+        ):
+            return
+        credentials = get_credentials(request)
+        if not (credentials and cache.get(pin_key(credentials))):
+            use_replica.set(True)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, also serving the React build from WHITENOISE_ROOT.
+    The build's static/ folder is collected into STATIC_ROOT with its
+    compressed copies, so files collected from it are served from there
+    rather than again from the build itself.
+    """
+    def add_file_to_dictionary(self, url, path, stat_cache=None):
+        # STATIC_ROOT is added first, so a collected copy is already known
+        if (
+            url in self.files
+            and self.root
+            and path.startswith(os.path.join(os.path.abspath(self.root), ''))
+        ):
+            return
+        super().add_file_to_dictionary(url, path, stat_cache=stat_cache)
+
+    def immutable_file_test(self, path, url):
+        """
+        Files hashed by the static files manifest, or React bundles
+        named with a content hash, never change.
+        """
+        if super().immutable_file_test(path, url):
+            return True
+        return (
+            url.startswith(self.static_prefix)
+            and REACT_BUNDLE.fullmatch(url[len(self.static_prefix):]) is not None
+        )
@@ -0,0 +1,96 @@
+"""
+Test helpers guarding against query count regressions.
+
+Tests wrap each endpoint call in assertQueryBaseline(), which fails if
+it runs more SQL queries than recorded in QUERY_BASELINE_FILE. After an
+intended change, re-record the file and commit it:
+
+    python manage.py test --update-query-baseline
+"""
+
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+
+# Highest query count seen per endpoint during this run
+measured_counts = {}
+recording = False
+
+
+def load_baseline() -> dict:
+    """Return the committed baseline, or {} if there is none yet."""
+    try:
+        with open(settings.QUERY_BASELINE_FILE) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(counts: dict):
+    """Write counts to the baseline file, sorted for readable diffs."""
+    with open(settings.QUERY_BASELINE_FILE, 'w') as baseline_file:
+        json.dump(counts, baseline_file, indent=4, sort_keys=True)
+        baseline_file.write('\n')
+
+
+class QueryBaselineMixin:
+    """TestCase mixin comparing endpoint query counts to the baseline."""
+    @contextmanager
+    def assertQueryBaseline(self, endpoint: str):
+        """
+        Fail if the wrapped block runs more queries than the baseline
+        allows for endpoint, e.g. 'GET user:check-me'.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield
+        count = len(context)
+        measured_counts[endpoint] = max(count, measured_counts.get(endpoint, 0))
+        if recording:
+            return
+
+        baseline = load_baseline()
+        if endpoint not in baseline:
+            self.fail(
+                f'No query baseline for {endpoint!r}; '
+                'record one with --update-query-baseline.'
+            )
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            count,
+            baseline[endpoint],
+            f'{endpoint} ran {count} queries, baseline is '
+            f'{baseline[endpoint]}:\n{queries}',
+        )
+
+
+class QueryBaselineRunner(DiscoverRunner):
+    """Test runner able to re-record the query baseline file."""
+    def __init__(self, update_query_baseline=False, **kwargs):
+        super().__init__(**kwargs)
+        self.update_query_baseline = update_query_baseline
+        if update_query_baseline:
+            # Counts are gathered in this process, so run serially
+            self.parallel = 1
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--update-query-baseline',
+            action='store_true',
+            help='Record query counts as the new baseline instead of '
+                 'checking them.',
+        )
+
+    def run_suite(self, suite, **kwargs):
+        global recording
+        recording = self.update_query_baseline
+        result = super().run_suite(suite, **kwargs)
+        if recording and result.wasSuccessful():
+            # Keep entries for endpoints that were not part of this run
+            save_baseline({**load_baseline(), **measured_counts})
+        return result
@@ -6,7 +6,9 @@ from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-class AdminSiteTests(TestCase):
+from helpers.testing import QueryBaselineMixin
+
+class AdminSiteTests(QueryBaselineMixin, TestCase):
     """Tests for Django Admin."""
     def setUp(self):
         self.client = Client()
@@ -23,18 +25,21 @@ class AdminSiteTests(TestCase):
     def test_user_list(self):
         """Test that users are listed on page."""
         url = reverse('admin:helpers_user_changelist')
-        res = self.client.get(url)
+        with self.assertQueryBaseline('GET admin:helpers_user_changelist'):
+            res = self.client.get(url)
         self.assertContains(res, self.user.name)
         self.assertContains(res, self.user.email)
 
     def test_edit_user_page(self):
         """Test that edit user page works."""
         url = reverse('admin:helpers_user_change', args=[self.user.id])
-        res = self.client.get(url)
+        with self.assertQueryBaseline('GET admin:helpers_user_change'):
+            res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
 
     def test_create_user_page(self):
         """Test to create user page works."""
         url = reverse('admin:helpers_user_add')
-        res = self.client.get(url)
+        with self.assertQueryBaseline('GET admin:helpers_user_add'):
+            res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
\ No newline at end of file
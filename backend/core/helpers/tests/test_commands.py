@@ -2,9 +2,11 @@
 Test custom Django management commands.
 """
 
+from io import StringIO
+from subprocess import CompletedProcess
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
@@ -26,4 +28,45 @@ class CommandTest(SimpleTestCase):
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 8)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   small
+import time:       300 |       5000 | big
+import time:      2000 |       2000 |   slow_self
+"""
+
+
+@patch('helpers.management.commands.profile_startup.subprocess.run')
+class ProfileStartupCommandTest(SimpleTestCase):
+    """Test the startup profiling command."""
+    def test_reports_slowest_cumulative(self, patched_run):
+        """Test modules are listed by cumulative import time."""
+        patched_run.return_value = CompletedProcess([], 0, '', IMPORTTIME_OUTPUT)
+        out = StringIO()
+
+        call_command('profile_startup', limit=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('3 modules imported in 2.4 ms', lines[0])
+        self.assertTrue(lines[2].endswith('big'))
+        self.assertTrue(lines[3].endswith('slow_self'))
+        self.assertEqual(len(lines), 4)
+        self.assertIn('-X', patched_run.call_args.args[0])
+
+    def test_reports_slowest_self(self, patched_run):
+        """Test modules can be ranked by their own import time."""
+        patched_run.return_value = CompletedProcess([], 0, '', IMPORTTIME_OUTPUT)
+        out = StringIO()
+
+        call_command('profile_startup', limit=1, sort='self', stdout=out)
+
+        self.assertTrue(out.getvalue().splitlines()[2].endswith('slow_self'))
+
+    def test_setup_failure_raises(self, patched_run):
+        """Test a failing Django setup is reported as a CommandError."""
+        patched_run.return_value = CompletedProcess([], 1, '', 'Traceback')
+
+        with self.assertRaises(CommandError):
+            call_command('profile_startup')
@@ -0,0 +1,122 @@
+"""
+Tests for read-replica routing.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.core.checks import run_checks
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from django.urls import resolve
+
+from helpers.db_routers import ReplicaRouter, use_replica
+from helpers.middleware import ReplicaRoutingMiddleware
+
+ME_PATH = '/api/user/me/'
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Test which database requests read from."""
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.used_replica = None
+
+    def view(self, request):
+        """Record the database reads are routed to."""
+        self.used_replica = self.router.db_for_read(get_user_model())
+        return HttpResponse()
+
+    def send(self, method, path=ME_PATH, **extra):
+        """Run a request through the middleware to self.view."""
+        request = getattr(self.factory, method)(path, **extra)
+        request.resolver_match = resolve(path)
+
+        def get_response(request):
+            middleware.process_view(request, self.view, (), {})
+            return self.view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def test_get_reads_from_replica(self):
+        """Test GET requests to routed namespaces use a replica."""
+        self.send('get', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertEqual(self.used_replica, 'replica1')
+
+    def test_get_other_namespace_reads_from_primary(self):
+        """Test GET requests outside routed namespaces use the primary."""
+        self.send('get', path='/admin/', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertIsNone(self.used_replica)
+
+    def test_write_pins_client_to_primary(self):
+        """Test reads follow a write to the primary for that client only."""
+        self.send('patch', HTTP_AUTHORIZATION='Token abc')
+        self.send('get', HTTP_AUTHORIZATION='Token abc')
+        self.assertIsNone(self.used_replica)
+
+        self.send('get', HTTP_AUTHORIZATION='Token xyz')
+        self.assertEqual(self.used_replica, 'replica1')
+
+    def test_write_does_not_pin_shared_address(self):
+        """Test clients behind the same proxy are pinned separately."""
+        self.send('patch', HTTP_AUTHORIZATION='Token abc', REMOTE_ADDR='10.0.0.1')
+        self.send('get', HTTP_AUTHORIZATION='Token xyz', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(self.used_replica, 'replica1')
+
+    def test_anonymous_write_pins_nothing(self):
+        """Test a write without credentials pins no one."""
+        self.send('post', path='/api/user/create/')
+        self.send('get')
+
+        self.assertEqual(self.used_replica, 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_reads_from_primary(self):
+        """Test nothing is routed when no replicas are configured."""
+        self.send('get', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertIsNone(self.used_replica)
+
+    def test_flag_reset_after_request(self):
+        """Test the replica flag does not leak past the request."""
+        self.send('get', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertFalse(use_replica.get())
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test writes and migrations always target the primary."""
+        self.assertEqual(self.router.db_for_write(get_user_model()), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'helpers'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'helpers'))
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    """Test replicas are refused without a shared cache for pinning."""
+    def error_ids(self):
+        return [error.id for error in run_checks(tags=['caches'])]
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_local_cache_with_replicas_fails(self):
+        """Test a process-local cache is an error when using replicas."""
+        self.assertIn('helpers.E001', self.error_ids())
+
+    @override_settings(
+        DATABASE_REPLICAS=['replica1'],
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://cache:6379/0',
+        }},
+    )
+    def test_shared_cache_with_replicas_passes(self):
+        """Test a shared cache satisfies the check."""
+        self.assertNotIn('helpers.E001', self.error_ids())
+
+    def test_no_replicas_passes(self):
+        """Test the cache does not matter without replicas."""
+        self.assertNotIn('helpers.E001', self.error_ids())
@@ -0,0 +1,156 @@
+"""
+Tests for serving static files and the frontend build.
+"""
+
+import gzip
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, Client, override_settings
+
+# Long enough for the compressed copies to be smaller, so they get used
+SCRIPT = b'hashed();' * 100
+STYLES = b'body { color: black; }\n' * 100
+
+
+class StaticFilesTests(SimpleTestCase):
+    """Test static files are served compressed with long-lived caching."""
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.static_root = Path(tmp_dir.name) / 'static'
+        self.frontend_root = Path(tmp_dir.name) / 'build'
+        self.write(self.static_root / 'js' / 'main.0123abcd.js', SCRIPT)
+        self.write(self.static_root / 'js' / 'plain.js', b'plain();')
+        self.write(self.static_root / 'export.20261019.json', b'{}')
+        # The build keeps its own uncompressed copy of collected bundles
+        (self.frontend_root / 'static' / 'js').mkdir(parents=True)
+        (self.frontend_root / 'static' / 'js' / 'main.0123abcd.js') \
+            .write_bytes(SCRIPT)
+        (self.frontend_root / 'static' / 'js' / 'late.89abcdef.js') \
+            .write_bytes(SCRIPT)
+        (self.frontend_root / 'index.html').write_bytes(b'<div id="root"></div>')
+
+        settings = override_settings(
+            STATIC_ROOT=self.static_root,
+            WHITENOISE_ROOT=self.frontend_root,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Created after overriding, as middleware reads settings on load
+        self.client = Client()
+
+    def write(self, path, content):
+        """Write a file and its precompressed gzip copy."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        path.with_name(path.name + '.gz').write_bytes(gzip.compress(content))
+
+    def test_hashed_file_cached_forever(self):
+        """Test content-hashed files are marked immutable."""
+        res = self.client.get('/static/js/main.0123abcd.js')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_unhashed_file_not_immutable(self):
+        """Test files without a hash may still change."""
+        for url in ['/static/js/plain.js', '/static/export.20261019.json']:
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_compressed_variant_served(self):
+        """
+        Test the precompressed copy from STATIC_ROOT is sent to clients
+        accepting it, not the build's uncompressed copy.
+        """
+        res = self.client.get(
+            '/static/js/main.0123abcd.js',
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(res.streaming_content)), SCRIPT)
+
+    def test_uncollected_bundle_served_from_build(self):
+        """Test bundles not collected yet are still served from the build."""
+        res = self.client.get('/static/js/late.89abcdef.js')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), SCRIPT)
+
+    def test_frontend_index_served(self):
+        """Test the React build's index page is served at the root."""
+        res = self.client.get('/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'id="root"', b''.join(res.streaming_content))
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+
+class StaticFilesStorageTests(SimpleTestCase):
+    """Test collectstatic output with the project's storage."""
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.source = Path(tmp_dir.name) / 'source'
+        self.static_root = Path(tmp_dir.name) / 'static'
+        (self.source / 'css').mkdir(parents=True)
+        (self.source / 'img').mkdir()
+        (self.source / 'img' / 'dot.png').write_bytes(b'png')
+
+    def collectstatic(self):
+        """Collect self.source into self.static_root."""
+        with override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE='helpers.storage.StaticFilesStorage',
+        ):
+            call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    def test_hashed_and_compressed_copies(self):
+        """Test files get hashed names and gzip and brotli copies."""
+        (self.source / 'css' / 'site.css').write_bytes(
+            STYLES + b'a { background: url("../img/dot.png"); }\n'
+        )
+
+        self.collectstatic()
+
+        manifest = json.loads((self.static_root / 'staticfiles.json').read_text())
+        hashed = self.static_root / manifest['paths']['css/site.css']
+        self.assertNotEqual(hashed.name, 'site.css')
+        self.assertTrue(hashed.with_name(hashed.name + '.gz').exists())
+        self.assertTrue(hashed.with_name(hashed.name + '.br').exists())
+        self.assertIn(
+            manifest['paths']['img/dot.png'].split('/')[-1],
+            hashed.read_text(),
+        )
+
+    def test_missing_source_map_skipped(self):
+        """Test a source map the package does not ship is left alone."""
+        (self.source / 'css' / 'site.css').write_bytes(
+            STYLES + b'/*# sourceMappingURL=site.css.map */\n'
+        )
+
+        self.collectstatic()
+
+        manifest = json.loads((self.static_root / 'staticfiles.json').read_text())
+        hashed = self.static_root / manifest['paths']['css/site.css']
+        self.assertIn('sourceMappingURL=site.css.map', hashed.read_text())
+
+    def test_missing_file_still_fails(self):
+        """Test references to other missing files are still errors."""
+        (self.source / 'css' / 'site.css').write_bytes(
+            b'a { background: url("../img/missing.png"); }\n'
+        )
+
+        with self.assertRaises(ValueError):
+            self.collectstatic()
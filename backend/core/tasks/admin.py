@@ -1,3 +1,22 @@
+"""
+Django admin customization for tasks
+"""
+
 from django.contrib import admin
 
-# Register your models here.
+from tasks import models
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Define the admin pages for tasks."""
+    ordering = ['id']
+    list_display = ['title', 'user', 'completed', 'due_date']
+    list_filter = ['completed']
+
+    def delete_queryset(self, request, queryset):
+        """Delete one by one, so each task updates the stats."""
+        for task in queryset:
+            task.delete()
+
+
+admin.site.register(models.Task, TaskAdmin)
@@ -0,0 +1,29 @@
+"""
+Django command to recount task stats from the tasks table
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskStats
+
+
+class Command(BaseCommand):
+    """Django command to rebuild per-user task stats."""
+    help = 'Recount task stats, e.g. after bulk updates that skip Task.save().'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='Users to rebuild stats for (default: all users).',
+        )
+
+    def handle(self, *args, **options):
+        """EntryPoint for Command."""
+        user_ids = options['user_ids'] or \
+            get_user_model().objects.values_list('pk', flat=True).iterator()
+        rebuilt = 0
+        for user_id in user_ids:
+            TaskStats.objects.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt task stats for {rebuilt} users.'))
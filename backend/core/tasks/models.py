@@ -1,3 +1,227 @@
-from django.db import models
+"""
+Database Models for tasks.
+"""
 
-# Create your models here.
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from tasks.realtime import publish_task_event
+
+# Fields of a task that its user's TaskStats depend on
+STATS_FIELDS = ('user_id', 'completed', 'due_date')
+# Stands in for a stats field that was deferred when the task was loaded
+UNKNOWN = object()
+
+
+class Task(models.Model):
+    """A task on a user's list."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+    )
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    completed = models.BooleanField(default=False)
+    due_date = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    # STATS_FIELDS as last stored; None if not saved yet
+    _saved_state = None
+
+    class Meta:
+        indexes = [
+            # Used to count overdue tasks when keeping TaskStats up to date
+            models.Index(fields=['user', 'completed', 'due_date']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Reading a deferred field here would load it through from_db again
+        instance._saved_state = tuple(
+            getattr(instance, field) if field in field_names else UNKNOWN
+            for field in STATS_FIELDS
+        )
+        return instance
+
+    def _stats_state(self) -> tuple:
+        return tuple(getattr(self, field) for field in STATS_FIELDS)
+
+    def _complete_saved_state(self):
+        """
+        Fill in the stored user if it was deferred, as assigning a new
+        user would lose it. Other unknown fields make record_change()
+        rebuild the stats instead.
+        """
+        if self._saved_state is not None and self._saved_state[0] is UNKNOWN:
+            user_id = Task.objects.filter(pk=self.pk) \
+                .values_list('user_id', flat=True).first()
+            self._saved_state = (user_id,) + self._saved_state[1:]
+
+    def save(self, *args, **kwargs):
+        """Save the task and update its user's stats in one transaction."""
+        action = 'created' if self._state.adding else 'updated'
+        with transaction.atomic():
+            self._complete_saved_state()
+            super().save(*args, **kwargs)
+            TaskStats.record_change(self._saved_state, self._stats_state())
+            self._saved_state = self._stats_state()
+            publish_task_event(self.user_id, action, {
+                'id': self.pk,
+                'title': self.title,
+                'completed': self.completed,
+                'due_date': self.due_date and self.due_date.isoformat(),
+            })
+
+    def delete(self, *args, **kwargs):
+        """Delete the task and update its user's stats in one transaction."""
+        pk = self.pk
+        with transaction.atomic():
+            self._complete_saved_state()
+            # A deferred user can't be loaded once the row is gone
+            user_id = self._saved_state[0] if self._saved_state else self.user_id
+            result = super().delete(*args, **kwargs)
+            TaskStats.record_change(self._saved_state, None)
+            self._saved_state = None
+            publish_task_event(user_id, 'deleted', {'id': pk})
+        return result
+
+
+class TaskStatsManager(models.Manager):
+    """Manager for per-user task stats."""
+    def for_user(self, user_id) -> 'TaskStats':
+        """
+        Return up to date stats for a user.
+        Normally a single primary key lookup.
+        """
+        stats = self.filter(pk=user_id).first()
+        if stats is None:
+            return self.rebuild(user_id)
+        if stats.is_overdue_stale():
+            # Only the overdue count moves with time
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                stats = self.lock(user_id)
+                stats.refresh_overdue()
+                stats.save(update_fields=['overdue_count', 'next_due'])
+        return stats
+
+    def lock(self, user_id) -> 'TaskStats':
+        """
+        Return a user's stats row, creating it if needed, locked until
+        the end of the current transaction.
+        """
+        manager = self.db_manager(DEFAULT_DB_ALIAS)
+        # A concurrent first write for the user waits here for ours
+        manager.get_or_create(user_id=user_id)
+        return manager.select_for_update().get(pk=user_id)
+
+    def rebuild(self, user_id) -> 'TaskStats':
+        """Recount a user's stats from their tasks and store them."""
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            # Lock before counting, so no write in between is lost
+            stats = self.lock(user_id)
+            now = timezone.now()
+            open_tasks = Q(completed=False)
+            counts = Task.objects.using(DEFAULT_DB_ALIAS) \
+                .filter(user_id=user_id) \
+                .aggregate(
+                    open_count=Count('pk', filter=open_tasks),
+                    completed_count=Count('pk', filter=Q(completed=True)),
+                    overdue_count=Count('pk', filter=open_tasks & Q(due_date__lte=now)),
+                    next_due=Min('due_date', filter=open_tasks & Q(due_date__gt=now)),
+                )
+            for field, value in counts.items():
+                setattr(stats, field, value)
+            stats.save()
+        return stats
+
+
+class TaskStats(models.Model):
+    """
+    Running task counts for a user, kept up to date on every Task write
+    so they can be read without counting the user's tasks.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_stats',
+    )
+    open_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    overdue_count = models.PositiveIntegerField(default=0)
+    # Earliest due date of an open task that was not yet overdue. Once it
+    # passes, overdue_count is out of date and must be recounted.
+    next_due = models.DateTimeField(null=True, blank=True)
+
+    objects = TaskStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'task stats'
+
+    def is_overdue_stale(self) -> bool:
+        """Check if a task became overdue since overdue_count was set."""
+        return self.next_due is not None and self.next_due <= timezone.now()
+
+    def refresh_overdue(self):
+        """Recount overdue tasks, which only changes with due dates."""
+        now = timezone.now()
+        open_tasks = Task.objects.using(DEFAULT_DB_ALIAS) \
+            .filter(user_id=self.user_id, completed=False)
+        result = open_tasks.aggregate(
+            overdue_count=Count('pk', filter=Q(due_date__lte=now)),
+            next_due=Min('due_date', filter=Q(due_date__gt=now)),
+        )
+        self.overdue_count = result['overdue_count']
+        self.next_due = result['next_due']
+
+    @classmethod
+    def record_change(cls, old_state, new_state):
+        """
+        Move a task's contribution from old_state to new_state, each a
+        STATS_FIELDS tuple or None. Must be called inside the transaction
+        that wrote the task.
+        """
+        if old_state == new_state:
+            return
+        if old_state is not None and UNKNOWN in old_state:
+            # Not known what to take away, so recount the affected users
+            for user_id in {old_state[0], new_state and new_state[0]} - {None}:
+                cls.objects.rebuild(user_id)
+            return
+        # Net change per user, so each stats row is updated once
+        changes = defaultdict(Counter)
+        due_dates_changed = set()
+        for state, change in ((old_state, -1), (new_state, 1)):
+            if state is None:
+                continue
+            user_id, completed, due_date = state
+            counter = 'completed_count' if completed else 'open_count'
+            changes[user_id][counter] += change
+            if due_date is not None:
+                due_dates_changed.add(user_id)
+        for user_id, counts in changes.items():
+            # Lock the row so concurrent writes for a user apply in turn
+            stats = cls.objects.select_for_update() \
+                .filter(pk=user_id).first()
+            if stats is None or any(
+                getattr(stats, counter) + change < 0
+                for counter, change in counts.items()
+            ):
+                # Missing or drifted (e.g. after a bulk update); the
+                # recount already includes this write
+                cls.objects.rebuild(user_id)
+                continue
+            for counter, change in counts.items():
+                setattr(stats, counter, getattr(stats, counter) + change)
+            if user_id in due_dates_changed:
+                stats.refresh_overdue()
+            stats.save()
@@ -0,0 +1,267 @@
+"""
+Real-time task events pushed to clients over WebSockets.
+
+Events are fanned out in-process by the TaskEventHub. When running on
+PostgreSQL, events are published with NOTIFY so every ASGI process
+LISTENing on the channel receives them, not just the one that wrote.
+
+Clients authenticate with their API token, sent as the subprotocols
+['token', <key>] (browsers can't set headers on WebSockets) or in an
+Authorization header. A ?token=<key> query string is also accepted, but
+ends up in server access logs, so should be avoided.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connection,
+    connections,
+    transaction,
+)
+from rest_framework import authentication, exceptions
+
+NOTIFY_CHANNEL = 'task_events'
+WEBSOCKET_PATH = '/ws/tasks/'
+
+# Subprotocol naming the token auth scheme, followed by the token itself
+TOKEN_SUBPROTOCOL = 'token'
+
+# Close codes in the 4000-4999 range are reserved for applications.
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+# Standard code for a server error, e.g. the database being unavailable
+CLOSE_SERVER_ERROR = 1011
+
+# Seconds to wait before reconnecting the LISTEN bridge, doubling per failure
+LISTEN_RETRY_MIN = 1
+LISTEN_RETRY_MAX = 30
+
+logger = logging.getLogger(__name__)
+
+
+class TaskEventHub:
+    """In-process fan-out of task events to each user's sockets."""
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listener = None
+        # Set while the LISTEN bridge is connected and listening
+        self.listening = threading.Event()
+        self._stopping = threading.Event()
+
+    def subscribe(self, user_id) -> asyncio.Queue:
+        """Register a queue for user_id on the running event loop."""
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[user_id].add(
+                (asyncio.get_running_loop(), queue)
+            )
+        self.start_listener()
+        return queue
+
+    def unsubscribe(self, user_id, queue: asyncio.Queue):
+        """Remove a queue registered with subscribe()."""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update(
+                [sub for sub in subscribers if sub[1] is queue]
+            )
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def dispatch(self, user_id, event: dict):
+        """
+        Hand event to every socket of user_id in this process.
+        Safe to call from any thread.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        if subscribers:
+            self.start_listener()
+
+    def start_listener(self):
+        """Start the LISTEN bridge on PostgreSQL, unless it is running."""
+        if connection.vendor != 'postgresql':
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen_forever,
+                name='task-event-listener',
+                daemon=True,
+            )
+            self._listener.start()
+
+    def stop_listener(self):
+        """Stop the LISTEN bridge and close its connection."""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        self._stopping.set()
+        listener.join()
+        self._stopping.clear()
+
+    def _listen_forever(self):
+        """Keep the LISTEN bridge up, reconnecting after any failure."""
+        delay = LISTEN_RETRY_MIN
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception:
+                if self.listening.is_set():
+                    # It had connected, so this is a fresh failure
+                    self.listening.clear()
+                    delay = LISTEN_RETRY_MIN
+                logger.exception(
+                    'Task event listener failed, reconnecting in %ss', delay,
+                )
+                self._stopping.wait(delay)
+                delay = min(delay * 2, LISTEN_RETRY_MAX)
+        self.listening.clear()
+
+    def _listen(self):
+        """Relay NOTIFY payloads from PostgreSQL into dispatch()."""
+        wrapper = connections['default']
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            self.listening.set()
+            while not self._stopping.is_set():
+                # Wake up periodically to notice stop_listener()
+                if select.select([conn], [], [], 1) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._relay(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _relay(self, payload: str):
+        """Dispatch one NOTIFY payload, skipping malformed ones."""
+        try:
+            message = json.loads(payload)
+            user_id, event = message['user'], message['event']
+        except (ValueError, TypeError, KeyError):
+            logger.warning('Ignoring malformed task event: %r', payload)
+            return
+        self.dispatch(user_id, event)
+
+
+hub = TaskEventHub()
+
+
+def publish_task_event(user_id, action: str, data: dict):
+    """
+    Publish a task change to the sockets of user_id.
+    Delivery happens once the current transaction commits.
+    """
+    event = {'type': f'task.{action}', 'data': data}
+    if connection.vendor == 'postgresql':
+        # NOTIFY is itself transactional, and reaches every process.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [NOTIFY_CHANNEL, json.dumps({'user': user_id, 'event': event})],
+            )
+    else:
+        transaction.on_commit(lambda: hub.dispatch(user_id, event))
+
+
+def _get_token(scope) -> str:
+    """
+    Read the token from the subprotocols, the Authorization header or
+    the query string, in that order.
+    """
+    subprotocols = scope.get('subprotocols', [])
+    if len(subprotocols) == 2 and subprotocols[0] == TOKEN_SUBPROTOCOL:
+        return subprotocols[1]
+    headers = dict(scope.get('headers', []))
+    auth = headers.get(b'authorization', b'').decode().split()
+    if len(auth) == 2 and auth[0].lower() == 'token':
+        return auth[1]
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if 'token' in query:
+        return query['token'][0]
+    return ''
+
+
+@sync_to_async
+def _authenticate(key: str):
+    """Authenticate the same way as the token-protected API views."""
+    # Sockets bypass the request cycle that normally discards broken or
+    # expired connections, e.g. after a database restart
+    close_old_connections()
+    try:
+        user, _token = authentication.TokenAuthentication() \
+            .authenticate_credentials(key)
+    except exceptions.AuthenticationFailed:
+        return None
+    finally:
+        close_old_connections()
+    return user
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application streaming task events to an authenticated user."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    key = _get_token(scope)
+    try:
+        user = await _authenticate(key) if key else None
+    except DatabaseError:
+        logger.exception('Could not authenticate task event socket')
+        await send({'type': 'websocket.close', 'code': CLOSE_SERVER_ERROR})
+        return
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    accept = {'type': 'websocket.accept'}
+    if TOKEN_SUBPROTOCOL in scope.get('subprotocols', []):
+        # Browsers drop sockets that don't confirm a requested subprotocol
+        accept['subprotocol'] = TOKEN_SUBPROTOCOL
+    await send(accept)
+    queue = hub.subscribe(user.pk)
+    receiver = asyncio.ensure_future(receive())
+    getter = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            done, _pending = await asyncio.wait(
+                {receiver, getter},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                await send({
+                    'type': 'websocket.send',
+                    'text': json.dumps(getter.result()),
+                })
+                getter = asyncio.ensure_future(queue.get())
+            if receiver in done:
+                # Clients only listen; anything but a disconnect is ignored.
+                if receiver.result()['type'] == 'websocket.disconnect':
+                    break
+                receiver = asyncio.ensure_future(receive())
+    finally:
+        receiver.cancel()
+        getter.cancel()
+        hub.unsubscribe(user.pk, queue)
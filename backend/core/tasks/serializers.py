@@ -0,0 +1,16 @@
+"""
+Serializers for the tasks API.
+"""
+
+from rest_framework import serializers
+
+from tasks.models import TaskStats
+
+
+class TaskStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a user's task counts."""
+
+    class Meta:
+        model = TaskStats
+        fields = ['open_count', 'completed_count', 'overdue_count']
+        read_only_fields = fields
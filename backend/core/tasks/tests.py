@@ -1,3 +1,489 @@
-from django.test import TestCase
+"""
+Tests for the tasks app.
+"""
 
-# Create your tests here.
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from helpers.testing import QueryBaselineMixin
+from tasks.models import Task, TaskStats, TaskStatsManager
+from tasks.realtime import (
+    CLOSE_NOT_FOUND,
+    CLOSE_SERVER_ERROR,
+    CLOSE_UNAUTHORIZED,
+    WEBSOCKET_PATH,
+    LISTEN_RETRY_MAX,
+    NOTIFY_CHANNEL,
+    TOKEN_SUBPROTOCOL,
+    hub,
+    publish_task_event,
+    websocket_application,
+)
+
+
+class WebSocketClient:
+    """Minimal driver for calling an ASGI WebSocket application."""
+    def __init__(self, path=WEBSOCKET_PATH, query_string=b'', headers=(),
+                 subprotocols=()):
+        self.scope = {
+            'type': 'websocket',
+            'path': path,
+            'query_string': query_string,
+            'headers': list(headers),
+            'subprotocols': list(subprotocols),
+        }
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+
+    async def connect(self):
+        """Start the application and return its first message."""
+        self.task = asyncio.ensure_future(
+            websocket_application(self.scope, self.inbox.get, self.outbox.put)
+        )
+        await self.inbox.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outbox.get(), timeout=5)
+
+    async def disconnect(self):
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout=1)
+
+
+class TaskEventHubTests(TestCase):
+    """Test the in-process fan-out hub."""
+    def setUp(self):
+        # Subscribing starts the LISTEN bridge, whose connection would
+        # keep the test database from being dropped
+        self.addCleanup(hub.stop_listener)
+
+    async def test_dispatch_reaches_only_that_user(self):
+        """Test events are delivered to the subscribed user only."""
+        first = hub.subscribe(1)
+        second = hub.subscribe(2)
+        hub.dispatch(1, {'type': 'task.created'})
+        await asyncio.sleep(0)
+
+        self.assertEqual(await first.get(), {'type': 'task.created'})
+        self.assertTrue(second.empty())
+        hub.unsubscribe(1, first)
+        hub.unsubscribe(2, second)
+
+    async def test_unsubscribed_queue_gets_nothing(self):
+        """Test a queue stops receiving events once unsubscribed."""
+        queue = hub.subscribe(1)
+        hub.unsubscribe(1, queue)
+        hub.dispatch(1, {'type': 'task.created'})
+        await asyncio.sleep(0)
+
+        self.assertTrue(queue.empty())
+
+
+class TaskWebSocketTests(TransactionTestCase):
+    """
+    Test the task event WebSocket endpoint.
+    Runs outside a test transaction, which closing stale connections
+    on authentication would roll back.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='socket@example.com',
+            password='Password+123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.addCleanup(hub.stop_listener)
+
+    async def test_connect_without_token_rejected(self):
+        """Test connecting without a token closes the socket."""
+        client = WebSocketClient()
+        message = await client.connect()
+
+        self.assertEqual(message['type'], 'websocket.close')
+        self.assertEqual(message['code'], CLOSE_UNAUTHORIZED)
+
+    async def test_connect_bad_token_rejected(self):
+        """Test connecting with an unknown token closes the socket."""
+        client = WebSocketClient(query_string=b'token=not-a-token')
+        message = await client.connect()
+
+        self.assertEqual(message['code'], CLOSE_UNAUTHORIZED)
+
+    async def test_unknown_path_rejected(self):
+        """Test only the task event path accepts connections."""
+        client = WebSocketClient(
+            path='/ws/other/',
+            query_string=f'token={self.token.key}'.encode(),
+        )
+        message = await client.connect()
+
+        self.assertEqual(message['code'], CLOSE_NOT_FOUND)
+
+    async def test_connect_with_subprotocol(self):
+        """Test a token sent as a subprotocol is accepted and confirmed."""
+        client = WebSocketClient(subprotocols=[TOKEN_SUBPROTOCOL, self.token.key])
+        message = await client.connect()
+
+        self.assertEqual(message, {
+            'type': 'websocket.accept',
+            'subprotocol': TOKEN_SUBPROTOCOL,
+        })
+        await client.disconnect()
+
+    async def test_connect_with_header(self):
+        """Test a token in the Authorization header is accepted."""
+        client = WebSocketClient(headers=[
+            (b'authorization', f'Token {self.token.key}'.encode()),
+        ])
+        message = await client.connect()
+
+        self.assertEqual(message, {'type': 'websocket.accept'})
+        await client.disconnect()
+
+    async def test_stale_connections_closed(self):
+        """Test connections are checked around authenticating."""
+        client = WebSocketClient(query_string=f'token={self.token.key}'.encode())
+        with patch('tasks.realtime.close_old_connections') as patched_close:
+            message = await client.connect()
+
+        self.assertEqual(message['type'], 'websocket.accept')
+        self.assertEqual(patched_close.call_count, 2)
+        await client.disconnect()
+
+    @patch('rest_framework.authentication.TokenAuthentication.authenticate_credentials')
+    async def test_database_error_closes(self, patched_authenticate):
+        """Test the socket is closed if the database is unavailable."""
+        patched_authenticate.side_effect = OperationalError
+        client = WebSocketClient(query_string=f'token={self.token.key}'.encode())
+
+        with self.assertLogs('tasks.realtime', level='ERROR'):
+            message = await client.connect()
+
+        self.assertEqual(message['code'], CLOSE_SERVER_ERROR)
+
+
+class StopListening(BaseException):
+    """Raised by tests to break out of the listener's retry loop."""
+
+
+class TaskEventListenerTests(TestCase):
+    """Test the LISTEN bridge survives errors."""
+    @patch.object(hub._stopping, 'wait')
+    @patch('tasks.realtime.TaskEventHub._listen')
+    def test_reconnects_with_backoff(self, patched_listen, patched_wait):
+        """Test failures are retried with a growing, capped delay."""
+        patched_listen.side_effect = [ConnectionError] * 7 + [StopListening]
+
+        with self.assertLogs('tasks.realtime', level='ERROR'):
+            with self.assertRaises(StopListening):
+                hub._listen_forever()
+
+        delays = [call.args[0] for call in patched_wait.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 8, 16, LISTEN_RETRY_MAX, LISTEN_RETRY_MAX])
+
+    @patch('tasks.realtime.TaskEventHub.dispatch')
+    def test_malformed_payload_skipped(self, patched_dispatch):
+        """Test a bad payload is logged and not dispatched."""
+        with self.assertLogs('tasks.realtime', level='WARNING'):
+            hub._relay('not json')
+            hub._relay('{"event": {}}')
+        hub._relay('{"user": 1, "event": {"type": "task.created"}}')
+
+        patched_dispatch.assert_called_once_with(1, {'type': 'task.created'})
+
+
+class TaskEventDeliveryTests(TransactionTestCase):
+    """
+    Test published events reach sockets once committed.
+    Runs outside a test transaction, as NOTIFY is only sent on commit.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='delivery@example.com',
+            password='Password+123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        # Its connection would keep the test database from being dropped
+        self.addCleanup(hub.stop_listener)
+
+    async def connect(self):
+        """Open a socket, and wait for the LISTEN bridge if there is one."""
+        client = WebSocketClient(query_string=f'token={self.token.key}'.encode())
+        message = await client.connect()
+        self.assertEqual(message['type'], 'websocket.accept')
+        if connection.vendor == 'postgresql':
+            await sync_to_async(hub.listening.wait, thread_sensitive=False)(5)
+        return client
+
+    async def test_events_pushed_to_user(self):
+        """Test published task events are sent to the user's socket."""
+        client = await self.connect()
+
+        await sync_to_async(publish_task_event)(self.user.pk, 'created', {'id': 1})
+        message = await client.receive()
+
+        self.assertEqual(json.loads(message['text']), {
+            'type': 'task.created',
+            'data': {'id': 1},
+        })
+        await client.disconnect()
+
+    @skipUnless(connection.vendor == 'postgresql', 'LISTEN/NOTIFY needs PostgreSQL')
+    async def test_notify_from_other_process(self):
+        """Test NOTIFYs sent by another connection are relayed."""
+        client = await self.connect()
+
+        await sync_to_async(self.notify)('not json')
+        await sync_to_async(self.notify)(json.dumps({
+            'user': self.user.pk,
+            'event': {'type': 'task.deleted', 'data': {'id': 2}},
+        }))
+        message = await client.receive()
+
+        self.assertEqual(json.loads(message['text'])['type'], 'task.deleted')
+        await client.disconnect()
+
+    def notify(self, payload):
+        """Send a NOTIFY on a connection of its own, like another process."""
+        conn = connection.get_new_connection(connection.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+        finally:
+            conn.close()
+
+
+STATS_URL = reverse('tasks:stats')
+
+
+class TaskStatsTests(QueryBaselineMixin, TestCase):
+    """Test task stats are kept up to date on task writes."""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='stats@example.com',
+            password='Password+123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertStats(self, open_count, completed_count, overdue_count):
+        """Check stored stats and that they match a full recount."""
+        stats = TaskStats.objects.get(pk=self.user.pk)
+        self.assertEqual(
+            (stats.open_count, stats.completed_count, stats.overdue_count),
+            (open_count, completed_count, overdue_count),
+        )
+        rebuilt = TaskStats.objects.rebuild(self.user.pk)
+        self.assertEqual(
+            (rebuilt.open_count, rebuilt.completed_count, rebuilt.overdue_count),
+            (open_count, completed_count, overdue_count),
+        )
+
+    def test_create_complete_delete(self):
+        """Test counts follow a task through its life."""
+        task = Task.objects.create(user=self.user, title='Write tests')
+        Task.objects.create(user=self.user, title='Run tests')
+        self.assertStats(2, 0, 0)
+
+        task.completed = True
+        task.save()
+        self.assertStats(1, 1, 0)
+
+        task.delete()
+        self.assertStats(1, 0, 0)
+
+    def test_overdue_counted(self):
+        """Test open tasks past their due date are counted as overdue."""
+        yesterday = timezone.now() - timedelta(days=1)
+        task = Task.objects.create(user=self.user, title='Late', due_date=yesterday)
+        self.assertStats(1, 0, 1)
+
+        task.completed = True
+        task.save()
+        self.assertStats(0, 1, 0)
+
+    def test_task_becoming_overdue_counted(self):
+        """Test a task is counted once its due date passes."""
+        now = timezone.now()
+        Task.objects.create(
+            user=self.user,
+            title='Soon',
+            due_date=now + timedelta(hours=1),
+        )
+        self.assertEqual(TaskStats.objects.for_user(self.user.pk).overdue_count, 0)
+
+        with patch('django.utils.timezone.now', return_value=now + timedelta(hours=2)):
+            with patch.object(TaskStatsManager, 'rebuild') as patched_rebuild:
+                stats = TaskStats.objects.for_user(self.user.pk)
+
+        # Counted without recounting the user's whole task history
+        patched_rebuild.assert_not_called()
+        self.assertEqual(stats.overdue_count, 1)
+        self.assertIsNone(stats.next_due)
+
+    def test_due_date_change_refreshes_overdue_once(self):
+        """Test a rescheduled task recounts overdue tasks only once."""
+        task = Task.objects.create(
+            user=self.user,
+            title='Reschedule',
+            due_date=timezone.now() + timedelta(days=1),
+        )
+        task.due_date = timezone.now() - timedelta(days=1)
+
+        with patch.object(
+            TaskStats,
+            'refresh_overdue',
+            autospec=True,
+            side_effect=TaskStats.refresh_overdue,
+        ) as patched_refresh:
+            task.save()
+
+        self.assertEqual(patched_refresh.call_count, 1)
+        self.assertStats(1, 0, 1)
+
+    def test_reassigned_task_moves_counts(self):
+        """Test moving a task to another user updates both users."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='Password+123',
+        )
+        task = Task.objects.create(user=self.user, title='Hand over')
+        Task.objects.create(user=other, title='Existing')
+
+        task.user = other
+        task.save()
+
+        self.assertStats(0, 0, 0)
+        self.assertEqual(TaskStats.objects.get(pk=other.pk).open_count, 2)
+
+    def test_retrieve_stats(self):
+        """Test the stats endpoint returns the user's counts."""
+        Task.objects.create(user=self.user, title='Open')
+        Task.objects.create(user=self.user, title='Done', completed=True)
+
+        with self.assertQueryBaseline('GET tasks:stats'):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'open_count': 1,
+            'completed_count': 1,
+            'overdue_count': 0,
+        })
+
+    def test_retrieve_stats_unauthorized(self):
+        """Test authentication is required for stats."""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rebuild_command(self):
+        """Test the command repairs stats after a bulk update."""
+        Task.objects.create(user=self.user, title='Bulk')
+        Task.objects.filter(user=self.user).update(completed=True)
+
+        call_command('rebuild_task_stats', stdout=StringIO())
+
+        self.assertStats(0, 1, 0)
+
+    def test_deferred_fields_loaded(self):
+        """Test tasks loaded with only() or defer() still update stats."""
+        Task.objects.create(user=self.user, title='Deferred')
+
+        task = Task.objects.only('title').get()
+        task.completed = True
+        task.save()
+        self.assertStats(0, 1, 0)
+
+        task = Task.objects.defer('due_date').get()
+        task.due_date = timezone.now() - timedelta(days=1)
+        task.completed = False
+        task.save()
+        self.assertStats(1, 0, 1)
+
+        Task.objects.only('title').get().delete()
+        self.assertStats(0, 0, 0)
+
+    def test_deferred_user_reassigned(self):
+        """Test reassigning a task loaded without its user updates both."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='Password+123',
+        )
+        Task.objects.create(user=self.user, title='Hand over')
+
+        task = Task.objects.only('title').get()
+        task.user = other
+        task.save()
+
+        self.assertStats(0, 0, 0)
+        self.assertEqual(TaskStats.objects.get(pk=other.pk).open_count, 1)
+
+    def test_drifted_counter_rebuilt(self):
+        """Test a counter that would go negative is recounted instead."""
+        Task.objects.create(user=self.user, title='Bulk')
+        Task.objects.filter(user=self.user).update(completed=True)
+
+        task = Task.objects.get()
+        task.completed = False
+        task.save()
+
+        self.assertStats(1, 0, 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs row locking')
+class TaskStatsConcurrencyTests(TransactionTestCase):
+    """Test concurrent writes for a user are all counted."""
+    def test_concurrent_first_tasks(self):
+        """Test two first tasks written at once are both counted."""
+        user = get_user_model().objects.create_user(
+            email='race@example.com',
+            password='Password+123',
+        )
+        first_written = threading.Event()
+        release_first = threading.Event()
+
+        def write_first():
+            try:
+                with transaction.atomic():
+                    Task.objects.create(user=user, title='First')
+                    first_written.set()
+                    release_first.wait(5)
+            finally:
+                connection.close()
+
+        def write_second():
+            try:
+                # Blocks on the stats row until the first one commits
+                Task.objects.create(user=user, title='Second')
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=write_first)
+        second = threading.Thread(target=write_second)
+        first.start()
+        first_written.wait(5)
+        second.start()
+        second.join(0.5)
+        release_first.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(TaskStats.objects.get(pk=user.pk).open_count, 2)
@@ -0,0 +1,12 @@
+"""
+URL mappings for the tasks API.
+"""
+
+from django.urls import path
+from tasks import views
+
+app_name = 'tasks'
+
+urlpatterns = [
+    path('stats/', views.TaskStatsView.as_view(), name='stats'),
+]
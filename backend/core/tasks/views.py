@@ -1,3 +1,19 @@
-from django.shortcuts import render
+"""
+Views for the tasks API.
+"""
 
-# Create your views here.
+from rest_framework import generics, authentication, permissions
+
+from tasks.models import TaskStats
+from tasks.serializers import TaskStatsSerializer
+
+
+class TaskStatsView(generics.RetrieveAPIView):
+    """Retrieve task counts for the authenticated user."""
+    serializer_class = TaskStatsSerializer
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self):
+        """Retrieve the stored stats, without counting tasks."""
+        return TaskStats.objects.for_user(self.request.user.pk)
@@ -3,13 +3,17 @@ Tests for the user API.
 """
 
 from re import Match
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from helpers.db_routers import pin_key
+from helpers.testing import QueryBaselineMixin
+
 # returns full URL path
 CREATE_USER_URL = reverse('user:create-user')
 TOKEN_URL = reverse("user:create-token")
@@ -19,7 +23,7 @@ def create_user(**params):
     """Create and return a new user for TESTING purposes."""
     return get_user_model().objects.create_user(**params)
 
-class PublicUserApiTests(TestCase):
+class PublicUserApiTests(QueryBaselineMixin, TestCase):
     """Test the public features of the user API."""
     def setUp(self):
         """Instantiating APIClient object for use throughout testing."""
@@ -34,7 +38,8 @@ class PublicUserApiTests(TestCase):
             'name': 'John Doe',
         }
         # Post Data to Endpoint
-        res = self.client.post(CREATE_USER_URL, payload)
+        with self.assertQueryBaseline('POST user:create-user'):
+            res = self.client.post(CREATE_USER_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         # Fetch user from database to check values instead of the returned value
@@ -54,7 +59,8 @@ class PublicUserApiTests(TestCase):
         # pass dictionary in as kwargs
         create_user(**payload)
         # Now try to create user via endpoint
-        res = self.client.post(CREATE_USER_URL, payload)
+        with self.assertQueryBaseline('POST user:create-user'):
+            res = self.client.post(CREATE_USER_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
     
@@ -65,7 +71,8 @@ class PublicUserApiTests(TestCase):
             'password': 'abc',
             'name': 'John Doe',
         }
-        res = self.client.post(CREATE_USER_URL, payload)
+        with self.assertQueryBaseline('POST user:create-user'):
+            res = self.client.post(CREATE_USER_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         user_exists = get_user_model().objects.filter(
@@ -86,12 +93,24 @@ class PublicUserApiTests(TestCase):
             'email': user_details.get("email"),
             'password': user_details.get("password"),
         } # Send to endpoint to generate token :)
-        res = self.client.post(TOKEN_URL, payload)
+        with self.assertQueryBaseline('POST user:create-token'):
+            res = self.client.post(TOKEN_URL, payload)
             # We should get back a token
         
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('token', res.data)
     
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_create_token_pins_token(self):
+        """Test reads with a new token go to the primary for a while."""
+        cache.clear()
+        create_user(email='pin@example.com', password='TestPassword1234')
+        payload = {'email': 'pin@example.com', 'password': 'TestPassword1234'}
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertTrue(cache.get(pin_key(f'Token {res.data["token"]}')))
+
     def test_create_token_bad_email(self):
         """Test for returning errors instead of tokens for incorrect email credentials"""
         user_details = {
@@ -105,7 +124,8 @@ class PublicUserApiTests(TestCase):
             "email": "jdoe@gmail.com",
             "password": "DoesNotMatter123",
         } # Incorrect Email Address
-        res = self.client.post(TOKEN_URL, payload)
+        with self.assertQueryBaseline('POST user:create-token'):
+            res = self.client.post(TOKEN_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
             # We should get a 400 BAD REQUEST
@@ -125,7 +145,8 @@ class PublicUserApiTests(TestCase):
             "email": "",
             "password": user_details.get("password"),
         } # NO Email Address provided
-        res = self.client.post(TOKEN_URL, payload)
+        with self.assertQueryBaseline('POST user:create-token'):
+            res = self.client.post(TOKEN_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
             # We should get a 400 BAD REQUEST
@@ -145,7 +166,8 @@ class PublicUserApiTests(TestCase):
             "email": user_details.get("email"),
             "password": "Incorrect_Password",
         } # Incorrect password
-        res = self.client.post(TOKEN_URL, payload)
+        with self.assertQueryBaseline('POST user:create-token'):
+            res = self.client.post(TOKEN_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
             # We should get a 400 BAD REQUEST
@@ -165,7 +187,8 @@ class PublicUserApiTests(TestCase):
             "email": user_details.get("email"),
             "password": "",
         } # NO password provided
-        res = self.client.post(TOKEN_URL, payload)
+        with self.assertQueryBaseline('POST user:create-token'):
+            res = self.client.post(TOKEN_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
             # We should get a 400 BAD REQUEST
@@ -174,12 +197,13 @@ class PublicUserApiTests(TestCase):
 
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users."""
-        res = self.client.get(ME_URL)
+        with self.assertQueryBaseline('GET user:check-me'):
+            res = self.client.get(ME_URL)
             # Trying to get information about current user, before logging in
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
             # Expecting to get 401 NOT AUTHORIZED
 
-class PrivateUserApiTests(TestCase):
+class PrivateUserApiTests(QueryBaselineMixin, TestCase):
     """Test API requests that require authenitcation."""
     def setUp(self):
         self.user = create_user(
@@ -193,7 +217,8 @@ class PrivateUserApiTests(TestCase):
     
     def test_retrieve_profile_success(self):
         """Test retrieving profile for logged in user."""
-        res = self.client.get(ME_URL)
+        with self.assertQueryBaseline('GET user:check-me'):
+            res = self.client.get(ME_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, {
@@ -206,7 +231,8 @@ class PrivateUserApiTests(TestCase):
         Test POST is not allowed for the 'me' endpoing.
         Creating users is done via the 'create-user' endpoint.
         """
-        res = self.client.post(ME_URL, {})
+        with self.assertQueryBaseline('POST user:check-me'):
+            res = self.client.post(ME_URL, {})
 
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
     
@@ -216,7 +242,8 @@ class PrivateUserApiTests(TestCase):
             "name": "Black Adam",
             "password": "StrongerPassword!$%*753159",
         }
-        res = self.client.patch(ME_URL, payload)
+        with self.assertQueryBaseline('PATCH user:check-me'):
+            res = self.client.patch(ME_URL, payload)
             # Do we return the new name?
         self.user.refresh_from_db()
 
@@ -6,6 +6,7 @@ from django.shortcuts import render
 from rest_framework import generics, authentication, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from helpers.db_routers import pin_to_primary
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 # Create your views here.
@@ -19,6 +20,18 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """
+        Issue the token, and pin it to the primary database.
+        The client's next reads use the new token, not the credentials
+        this request was pinned by.
+        """
+        response = super().post(request, *args, **kwargs)
+        pin_to_primary(
+            f'{authentication.TokenAuthentication.keyword} {response.data["token"]}'
+        )
+        return response
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
@@ -0,0 +1,17 @@
+#!/bin/sh
+# Production entrypoint: prepare the database, then serve the ASGI app
+set -e
+
+# DEBUG is off here, so Django would reject every request without hosts
+if [ -z "$DJANGO_ALLOWED_HOSTS" ]; then
+    echo "DJANGO_ALLOWED_HOSTS must list the host names to serve" >&2
+    exit 1
+fi
+
+python manage.py wait_for_db
+python manage.py migrate --noinput
+
+exec gunicorn app.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --bind 0.0.0.0:8000 \
+    --workers "${WEB_CONCURRENCY:-2}"